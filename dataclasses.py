@@ -9,12 +9,15 @@
 # https://github.com/arvidma/dataclasses
 
 import copy
+import functools
 import inspect
 import itertools
 import keyword
+import operator
 import re
 import sys
 import types
+import weakref
 from reprlib import recursive_repr
 from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 
@@ -238,16 +241,38 @@ _FIELDS = "__dataclass_fields__"
 # @dataclass.
 _PARAMS = "__dataclass_params__"
 
+# The names of attributes in which asdict(), astuple() and replace()
+# cache per-class data on first use.  They are only ever looked up in
+# the class's own __dict__, so a subclass doesn't pick up the entry of
+# its base, and the cache lives and dies with the class.
+_FIELD_GETTERS = "__dataclass_field_getters__"
+_FIELD_VALUES_GETTER = "__dataclass_field_values_getter__"
+_REPLACE = "__dataclass_replace__"
+_CLASS_CACHES = (_FIELD_GETTERS, _FIELD_VALUES_GETTER, _REPLACE)
+
 # The name of the function, that if it exists, is called at the end of
 # __init__.
 _POST_INIT_NAME = "__post_init__"
 
+# The name of the slot in which the __hash__ of a frozen dataclass
+# with slots caches its result.
+_HASH_CACHE_SLOT = "__dataclass_hash__"
+
 # String regex that string annotations for ClassVar or InitVar must match.
 # Allows "identifier.identifier[" or "identifier[".
 # https://bugs.python.org/issue33453 for details.
 _MODULE_IDENTIFIER_RE = re.compile(r"^(?:\s*(\w+)\s*\.)?\s*(\w+)")
 
 
+# Returns one __match_args__ tuple for all classes whose positional
+# __init__ parameters have the same names.  Bounded, so that the names
+# of classes created on the fly (by make_dataclass(), say) don't pile
+# up for the life of the process.
+@functools.lru_cache(maxsize=256)
+def _shared_match_args(names: Tuple[str, ...]) -> Tuple[str, ...]:
+    return names
+
+
 class _KW_ONLY_TYPE:  # noqa: N801
     pass
 
@@ -462,6 +487,38 @@ def _tuple_str(obj_name: str, fields: Sequence[Field]) -> str:
     return f"({','.join([f'{obj_name}.{f.name}' for f in fields])},)"
 
 
+# Up to this many compare fields, the ordering methods compare field by
+# field (see _cmp_cascade()) instead of building two tuples.
+_MAX_CASCADE_FIELDS = 5
+
+
+def _cmp_cascade(fields: Sequence[Field], op: str) -> List[str]:
+    # Return the body lines of an ordering method that gives the same
+    # result as comparing the tuples of the fields with op, without
+    # building them: like tuple comparison, find the first pair of
+    # values that are neither identical nor equal and compare them
+    # with op.  If all pairs are equal, the tuples are too, so only
+    # <= and >= are true.  Each field is read once per side, as when
+    # building the tuples, in case it is a descriptor.
+    lines = []
+    for f in fields:
+        lines.append(f"   a,b=self.{f.name},other.{f.name}")
+        lines.append("   if a is not b and not a==b:")
+        lines.append(f"    return a{op}b")
+    lines.append(f"   return {op in ('<=', '>=')}")
+    return lines
+
+
+# Compiling the generated source is most of the cost of decorating a
+# class.  The text depends only on the shape of the class (field names,
+# flags, defaults are referenced by name), never on the values bound
+# into it, so structurally identical dataclasses can share one code
+# object; each still gets its own function objects from exec().
+@functools.lru_cache(maxsize=256)
+def _compile_create_fn(txt: str) -> types.CodeType:
+    return compile(txt, "<string>", "exec", dont_inherit=True)
+
+
 class _FuncBuilder:
     # Collects the source of all the methods we're going to add to a
     # class, then generates them with a single compile/exec when
@@ -556,7 +613,7 @@ class _FuncBuilder:
         ns: Dict[str, Any] = {}
         # exec() of generated source is how dataclasses builds __init__
         # and friends; the text is assembled here, never user-supplied.
-        exec(txt, self.globals, ns)  # noqa: S102
+        exec(_compile_create_fn(txt), self.globals, ns)  # noqa: S102
         fns = ns["__create_fn__"](**self.locals)
 
         # Now that we've generated the functions, assign them into cls.
@@ -582,17 +639,22 @@ class _FuncBuilder:
                         raise TypeError(error_msg)
 
 
-def _field_assign(frozen: bool, name: str, value: str, self_name: str) -> str:
+def _field_assign(
+    frozen: bool, name: str, value: str, self_name: str, slot_setter: bool = False
+) -> str:
     # If we're a frozen class, then assign to our fields in __init__
-    # via __dataclass_builtins_object__.__setattr__.  Otherwise, just
-    # use a simple assignment.
+    # via object.__setattr__, bound once as __dataclass_setattr__.  If
+    # the field lives in a slot, call that slot's descriptor directly
+    # instead (bound as __dataclass_set_<name>__), which skips the
+    # attribute lookup object.__setattr__ does on every call.
+    # Otherwise, just use a simple assignment.
     #
     # self_name is what "self" is called in this function: don't
     # hard-code "self", since that might be a field name.
     if frozen:
-        return (
-            f"  __dataclass_builtins_object__.__setattr__({self_name},{name!r},{value})"
-        )
+        if slot_setter:
+            return f"  __dataclass_set_{name}__({self_name},{value})"
+        return f"  __dataclass_setattr__({self_name},{name!r},{value})"
     return f"  {self_name}.{name}={value}"
 
 
@@ -602,6 +664,7 @@ def _field_init(
     globals: Dict[str, Any],  # noqa: A002
     self_name: str,
     slots: bool,
+    slot_descriptors: Mapping[str, Any],
 ) -> Optional[str]:
     # Return the text of the line in the body of __init__ that will
     # initialize this field.
@@ -662,7 +725,7 @@ def _field_init(
         return None
 
     # Now, actually generate the field assignment.
-    return _field_assign(frozen, f.name, value, self_name)
+    return _field_assign(frozen, f.name, value, self_name, f.name in slot_descriptors)
 
 
 def _init_param(f: Field) -> str:
@@ -705,8 +768,17 @@ def _init_fn(
     self_name: str,
     func_builder: _FuncBuilder,
     slots: bool = False,
+    slot_descriptors: Optional[Mapping[str, Any]] = None,
+    slots_cls: Optional[type] = None,
+    unconditional_add: bool = False,
 ) -> None:
     # fields contains both real fields and InitVar pseudo-fields.
+    # slot_descriptors maps the names of fields that a frozen class
+    # stores in slots to their member descriptors (see
+    # _slot_descriptors()).  Those descriptors belong to slots_cls, and
+    # are only used for instances of exactly that class: a subclass may
+    # override a field's attribute (with a property, say), which
+    # object.__setattr__ honours.
 
     # Make sure we don't have fields without defaults following fields
     # with defaults.  This actually would be caught when exec-ing the
@@ -729,18 +801,34 @@ def _init_fn(
     locals.update(
         {
             "__dataclass_HAS_DEFAULT_FACTORY__": _HAS_DEFAULT_FACTORY,
-            "__dataclass_builtins_object__": object,
+            "__dataclass_setattr__": object.__setattr__,
         }
     )
-
     body_lines = []
     for f in fields:
-        line = _field_init(f, frozen, locals, self_name, slots)
+        line = _field_init(f, frozen, locals, self_name, slots, {})
         # line is None means that this field doesn't require
         # initialization (it's a pseudo-field).  Just skip it.
         if line:
             body_lines.append(line)
 
+    if slot_descriptors:
+        for name, descriptor in slot_descriptors.items():
+            locals[f"__dataclass_set_{name}__"] = descriptor.__set__
+        locals["__dataclass_builtins_type__"] = type
+        locals["__dataclass_slots_cls__"] = slots_cls
+        slot_lines = []
+        for f in fields:
+            line = _field_init(f, frozen, locals, self_name, slots, slot_descriptors)
+            if line:
+                slot_lines.append(line)
+        body_lines = [
+            f"  if __dataclass_builtins_type__({self_name}) is __dataclass_slots_cls__:",
+            *[f" {line}" for line in slot_lines],
+            "  else:",
+            *[f" {line}" for line in body_lines],
+        ]
+
     # Does this class have a post-init function?
     if has_post_init:
         params_str = ",".join(f.name for f in fields if f._field_type is _FIELD_INITVAR)
@@ -763,6 +851,7 @@ def _init_fn(
         body_lines,
         locals=locals,
         return_type=None,
+        unconditional_add=unconditional_add,
     )
 
 
@@ -798,6 +887,12 @@ def _frozen_set_del_attr(
     )
 
 
+# Which ClassVar representation _is_classvar() has to test for.  This
+# can't change at runtime, and a failing hasattr() is slow enough to
+# matter when it runs for every field of every dataclass.
+_TYPING_HAS_CLASSVAR_CLASS = hasattr(sys.modules["typing"], "_ClassVar")
+
+
 def _is_classvar(a_type: Any, typing: Any) -> bool:
     # This test uses typing internals, but it's the best way to test
     # if this is a ClassVar.  Python 3.6 represents ClassVar[T] as an
@@ -805,7 +900,7 @@ def _is_classvar(a_type: Any, typing: Any) -> bool:
     # _GenericAlias with __origin__ set to ClassVar (this is the same
     # check CPython's own dataclasses uses, unchanged from 3.7 through
     # at least 3.13).
-    if hasattr(typing, "_ClassVar"):
+    if _TYPING_HAS_CLASSVAR_CLASS:
         return type(a_type) is typing._ClassVar
     return a_type is typing.ClassVar or (
         type(a_type) is typing._GenericAlias and a_type.__origin__ is typing.ClassVar
@@ -822,6 +917,18 @@ def _is_initvar(a_type: Any, dataclasses: Any) -> bool:
     return a_type is dataclasses.InitVar or type(a_type) is dataclasses.InitVar
 
 
+# The (module name, name) that _MODULE_IDENTIFIER_RE finds in a string
+# annotation, or None if it doesn't match.  This only depends on the
+# string, which _is_type() may be asked about three times per field
+# (KW_ONLY, ClassVar, and InitVar), so cache it.
+@functools.lru_cache(maxsize=1024)
+def _match_module_identifier(annotation: str) -> Optional[Tuple[Optional[str], str]]:
+    match = _MODULE_IDENTIFIER_RE.match(annotation)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
 def _is_type(
     annotation: str,
     cls: type,
@@ -869,10 +976,10 @@ def _is_type(
     # a eval() penalty for every single field of every dataclass
     # that's defined.  It was judged not worth it.
 
-    match = _MODULE_IDENTIFIER_RE.match(annotation)
+    match = _match_module_identifier(annotation)
     if match:
         ns: Optional[Dict[str, Any]] = None
-        module_name = match.group(1)
+        module_name, type_name = match
         if not module_name:
             # No module name, assume the class's module did
             # "from dataclasses import InitVar".
@@ -882,7 +989,7 @@ def _is_type(
             module = sys.modules.get(cls.__module__)
             if module and module.__dict__.get(module_name) is a_module:
                 ns = sys.modules.get(a_type.__module__).__dict__
-        if ns and is_type_predicate(ns.get(match.group(2)), a_module):
+        if ns and is_type_predicate(ns.get(type_name), a_module):
             return True
     return False
 
@@ -906,7 +1013,11 @@ def _get_field(cls: type, a_name: str, a_type: Any, default_kw_only: bool) -> Fi
         f = field(default=default)
 
     # Only at this point do we know the name and the type.  Set them.
-    f.name = a_name
+    # Names written in a class body are interned already; intern the
+    # rest (e.g. those passed to make_dataclass()) too, so that lookups
+    # by field name can take the identity fast path.  sys.intern()
+    # rejects str subclasses, so leave those alone.
+    f.name = sys.intern(a_name) if type(a_name) is str else a_name
     f.type = a_type
 
     # Assume it's a normal field until proven otherwise.  We're next
@@ -1011,9 +1122,52 @@ def _hash_set_none(cls: type, fields: List[Field], func_builder: _FuncBuilder) -
     cls.__hash__ = None  # type: ignore[assignment]
 
 
+def _hash_is_cached(cls: type) -> bool:
+    # Whether the __hash__ that _hash_add() generates for cls caches its
+    # result.  The fields of a frozen instance can't change through
+    # ordinary attribute assignment, so its hash can be computed once
+    # and kept in a slot that _add_slots() adds for the purpose.  But
+    # __init__ and __post_init__ may still set fields with
+    # object.__setattr__, possibly after hashing the instance, so only
+    # cache when the generated __init__ is all there is: no __init__ of
+    # the class's own, no __post_init__ and no InitVars.  Without slots
+    # the cache would have to live in the instance __dict__, which
+    # pickle and copy carry along, and str hashes differ between
+    # processes; so don't cache there.  Must be called before the
+    # generated methods are added to the class.
+    params = cls.__dict__[_PARAMS]
+    return (
+        params.frozen
+        and params.slots
+        and params.init
+        and "__init__" not in cls.__dict__
+        and not hasattr(cls, _POST_INIT_NAME)
+        and not any(
+            f._field_type is _FIELD_INITVAR for f in cls.__dict__[_FIELDS].values()
+        )
+    )
+
+
 def _hash_add(cls: type, fields: List[Field], func_builder: _FuncBuilder) -> None:
     flds = [f for f in fields if (f.compare if f.hash is None else f.hash)]
     self_tuple = _tuple_str("self", flds)
+    if _hash_is_cached(cls):
+        func_builder.add_fn(
+            "__hash__",
+            ("self",),
+            [
+                "  try:",
+                f"   return self.{_HASH_CACHE_SLOT}",
+                "  except AttributeError:",
+                "   pass",
+                f"  h = hash({self_tuple})",
+                f"  __dataclass_setattr__(self, {_HASH_CACHE_SLOT!r}, h)",
+                "  return h",
+            ],
+            locals={"__dataclass_setattr__": object.__setattr__},
+            unconditional_add=True,
+        )
+        return
     func_builder.add_fn(
         "__hash__",
         ("self",),
@@ -1058,14 +1212,115 @@ _hash_action = {
 # version of this table.
 
 
+# These go by the cached per-class field getters (see _field_getters()
+# and _values_getter()) rather than calling fields() and getattr() for
+# each instance.
 def _dataclass_getstate(self: Any) -> List[Any]:
-    return [getattr(self, f.name) for f in fields(self)]
+    return list(_field_values(self))
 
 
 def _dataclass_setstate(self: Any, state: List[Any]) -> None:
-    for field, value in zip(fields(self), state):
-        # use setattr because dataclass may be frozen
-        object.__setattr__(self, field.name, value)
+    # use object.__setattr__ because dataclass may be frozen; bind it
+    # once instead of looking it up for every field.
+    object_setattr = object.__setattr__
+    for (name, _), value in zip(_field_getters(type(self)), state):
+        object_setattr(self, name, value)
+
+
+# The __reduce_ex__ methods added by _reduce_ex_add(), so that
+# _has_custom_pickling() can tell them apart from user-defined ones.
+_GENERATED_REDUCE_EX: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+_PICKLE_HOOKS = (
+    "__reduce__",
+    "__reduce_ex__",
+    "__getstate__",
+    "__setstate__",
+    "__getnewargs__",
+    "__getnewargs_ex__",
+)
+
+
+def _has_custom_pickling(cls: type) -> bool:
+    # Return True if cls or one of its bases (other than object)
+    # defines a pickling hook that isn't one we added ourselves.
+    for name in _PICKLE_HOOKS:
+        for base in cls.__mro__[:-1]:
+            if name in base.__dict__:
+                hook = base.__dict__[name]
+                if not (
+                    hook is _dataclass_getstate
+                    or hook is _dataclass_setstate
+                    or (
+                        isinstance(hook, types.FunctionType)
+                        and hook in _GENERATED_REDUCE_EX
+                    )
+                ):
+                    return True
+                break
+    return False
+
+
+def _reduce_ex_add(
+    cls: type,
+    all_init_fields: List[Field],
+    std_init_fields: Sequence[Field],
+    has_post_init: bool,
+    has_user_init: bool,
+    func_builder: _FuncBuilder,
+) -> bool:
+    # For a frozen class with slots, pickle (and copy) instances as a
+    # call of the class with the field values as positional arguments,
+    # rather than through __getstate__ and __setstate__.  That is only
+    # equivalent if __init__ stores exactly its arguments: every field
+    # is a positional __init__ parameter, there are no InitVars and no
+    # __post_init__, nothing else customizes pickling, and calling the
+    # class does nothing more than object.__new__ and __init__ (no
+    # __new__ of its own, no metaclass __call__).  Returns True if
+    # __reduce_ex__ was added to func_builder.
+    if (
+        has_user_init
+        or has_post_init
+        or cls.__new__ is not object.__new__  # type: ignore[comparison-overlap]
+        or type(cls).__call__ is not type.__call__
+        or len(std_init_fields) != len(all_init_fields)
+        or any(f._field_type is not _FIELD for f in all_init_fields)
+        or len(all_init_fields) != len(fields(cls))
+        or _has_custom_pickling(cls)
+    ):
+        return False
+    # Instances of a subclass that isn't a dataclass itself may carry
+    # more state, so they get the default treatment.
+    func_builder.add_fn(
+        "__reduce_ex__",
+        ("self", "protocol"),
+        [
+            "  if self.__class__ is not __dataclass_reduce_cls__:",
+            "   return __dataclass_object_reduce_ex__(self, protocol)",
+            f"  return (__dataclass_reduce_cls__, {_tuple_str('self', std_init_fields)})",
+        ],
+        locals={
+            "__dataclass_reduce_cls__": cls,
+            "__dataclass_object_reduce_ex__": object.__reduce_ex__,
+        },
+    )
+    return True
+
+
+def _slot_descriptors(cls: type, fields: List[Field]) -> Dict[str, Any]:
+    # Map each field whose attribute resolves to a slot (of cls or of
+    # a base class) to that slot's member descriptor.  Fields that
+    # resolve to anything else are left out, and __init__ keeps using
+    # object.__setattr__ for them.
+    descriptors = {}
+    for f in fields:
+        for base in cls.__mro__:
+            if f.name in base.__dict__:
+                descriptor = base.__dict__[f.name]
+                if type(descriptor) is types.MemberDescriptorType:
+                    descriptors[f.name] = descriptor
+                break
+    return descriptors
 
 
 def _get_slots(cls: type) -> List[str]:
@@ -1113,7 +1368,9 @@ def _update_func_cell_for__class__(f: Any, oldcls: type, newcls: type) -> bool:
     return False
 
 
-def _add_slots(cls: type, is_frozen: bool, weakref_slot: bool) -> type:
+def _add_slots(
+    cls: type, is_frozen: bool, weakref_slot: bool, hash_cache_slot: bool = False
+) -> type:
     # Need to create a new class, since we can't set __slots__
     # after a class has been created.
 
@@ -1130,6 +1387,7 @@ def _add_slots(cls: type, is_frozen: bool, weakref_slot: bool) -> type:
     )
     # The slots for our class.  Remove slots from our base classes.  Add
     # '__weakref__' if weakref_slot was given, unless it is already present.
+    # Likewise the slot for the cached hash, if hash_cache_slot was given.
     cls_dict["__slots__"] = tuple(
         itertools.filterfalse(
             inherited_slots.__contains__,
@@ -1138,6 +1396,7 @@ def _add_slots(cls: type, is_frozen: bool, weakref_slot: bool) -> type:
                 # already present in inherited_slots
                 field_names,
                 ("__weakref__",) if weakref_slot else (),
+                (_HASH_CACHE_SLOT,) if hash_cache_slot else (),
             ),
         ),
     )
@@ -1193,6 +1452,25 @@ def _add_slots(cls: type, is_frozen: bool, weakref_slot: bool) -> type:
     return newcls
 
 
+class _LazyDoc:
+    # Stands in for the generated doc-string of a dataclass until it
+    # is first read.  Building it with inspect.signature() is a large
+    # part of the cost of decorating a class, and most classes never
+    # have their __doc__ read.  Both the class and its instances look
+    # __doc__ up through this descriptor in the class __dict__; the
+    # first lookup replaces it with the real string.
+    __slots__ = ()
+
+    def __get__(self, instance: Any, owner: type) -> str:
+        doc = owner.__name__ + str(inspect.signature(owner)).replace(" -> None", "")
+        # Bypass any __setattr__ the metaclass defines.
+        type.__setattr__(owner, "__doc__", doc)
+        return doc
+
+
+_LAZY_DOC = _LazyDoc()
+
+
 def _process_class(
     cls: type,
     init: bool,
@@ -1212,6 +1490,11 @@ def _process_class(
     # is defined by the base class, which is found first.
     fields = {}
 
+    # Drop anything asdict() and friends cached on cls before it became
+    # a dataclass of its own (as a subclass of one, say): it describes
+    # the wrong fields now.
+    _clear_class_caches(cls)
+
     if cls.__module__ in sys.modules:
         globals = sys.modules[cls.__module__].__dict__  # noqa: A001
     else:
@@ -1358,20 +1641,23 @@ def _process_class(
 
     func_builder = _FuncBuilder(globals)
 
-    if init:
-        # Does this class have a post-init function?
-        has_post_init = hasattr(cls, _POST_INIT_NAME)
+    # Does this class have a post-init function?
+    has_post_init = hasattr(cls, _POST_INIT_NAME)
+    # Did the class define its own __init__?  Tested before ours is
+    # added.
+    has_user_init = "__init__" in cls.__dict__
+    # The name to use for the "self" param in __init__.  Use "self" if
+    # possible.
+    init_self_name = "__dataclass_self__" if "self" in fields else "self"
 
+    if init:
         _init_fn(
             all_init_fields,
             std_init_fields,
             kw_only_init_fields,
             frozen,
             has_post_init,
-            # The name to use for the "self"
-            # param in __init__.  Use "self"
-            # if possible.
-            "__dataclass_self__" if "self" in fields else "self",
+            init_self_name,
             func_builder,
             slots,
         )
@@ -1379,8 +1665,11 @@ def _process_class(
     # Set __match_args__ if match_args is true and __init__ is being
     # generated.  Use the std_init_fields (non-kw-only) for this.
     if match_args:
+        match_args_names = tuple(f.name for f in std_init_fields)
         _set_new_attribute(
-            cls, "__match_args__", tuple(f.name for f in std_init_fields)
+            cls,
+            "__match_args__",
+            _shared_match_args(match_args_names),
         )
 
     # Get the fields as a list, and include only real fields.  This is
@@ -1433,16 +1722,20 @@ def _process_class(
             ("__gt__", ">"),
             ("__ge__", ">="),
         ]:
-            # Create a comparison function.  If the fields in the
-            # object are named 'x' and 'y', then self_tuple is the
-            # string '(self.x,self.y)' and other_tuple is the string
-            # '(other.x,other.y)'.
+            if len(flds) <= _MAX_CASCADE_FIELDS:
+                compare = _cmp_cascade(flds, op)
+            else:
+                # Create a comparison function.  If the fields in the
+                # object are named 'x' and 'y', then self_tuple is the
+                # string '(self.x,self.y)' and other_tuple is the
+                # string '(other.x,other.y)'.
+                compare = [f"   return {self_tuple}{op}{other_tuple}"]
             func_builder.add_fn(
                 name,
                 ("self", "other"),
                 [
                     "  if other.__class__ is self.__class__:",
-                    f"   return {self_tuple}{op}{other_tuple}",
+                    *compare,
                     "  return NotImplemented",
                 ],
                 overwrite_error="Consider using functools.total_ordering",
@@ -1455,23 +1748,58 @@ def _process_class(
     hash_action = _hash_action[
         bool(unsafe_hash), bool(eq), bool(frozen), has_explicit_hash
     ]
+    hash_cached = hash_action is _hash_add and _hash_is_cached(cls)
     if hash_action:
         cls.__hash__ = hash_action(cls, field_list, func_builder)  # type: ignore[assignment]
 
-    # Generate the methods and add them to the class.  This needs to
-    # be done before the __doc__ logic below, since inspect will look
-    # at the __init__ signature.
+    # Generate the methods and add them to the class.
     func_builder.add_fns_to_class(cls)
 
-    if not cls.__doc__:
-        # Create a class doc-string.
-        cls.__doc__ = cls.__name__ + str(inspect.signature(cls)).replace(" -> None", "")
-
     if slots:
-        cls = _add_slots(cls, frozen, weakref_slot)
+        cls = _add_slots(cls, frozen, weakref_slot, hash_cached)
+        if init and frozen and not has_user_init:
+            # Now that the slotted class exists, replace the __init__
+            # generated above by one that stores through the slot
+            # descriptors directly.  The class namespace, and so the
+            # metaclass and __init_subclass__(), saw the generated
+            # __init__ all along; this one has the same signature.
+            init_builder = _FuncBuilder(globals)
+            slot_descriptors = _slot_descriptors(cls, all_init_fields)
+            if slot_descriptors:
+                _init_fn(
+                    all_init_fields,
+                    std_init_fields,
+                    kw_only_init_fields,
+                    frozen,
+                    has_post_init,
+                    init_self_name,
+                    init_builder,
+                    slots,
+                    slot_descriptors,
+                    cls,
+                    unconditional_add=True,
+                )
+            add_reduce_ex = _reduce_ex_add(
+                cls,
+                all_init_fields,
+                std_init_fields,
+                has_post_init,
+                has_user_init,
+                init_builder,
+            )
+            init_builder.add_fns_to_class(cls)
+            if add_reduce_ex:
+                _GENERATED_REDUCE_EX.add(cls.__dict__["__reduce_ex__"])
     elif weakref_slot:
         raise TypeError("weakref_slot requires slots=True")
 
+    # This needs to be done after __init__ has been added, since
+    # inspect will look at its signature.
+    if not cls.__doc__:
+        # Create a class doc-string, when it's first read.  setattr(),
+        # since mypy only allows str or None for __doc__.
+        setattr(cls, "__doc__", _LAZY_DOC)  # noqa: B010
+
     return cls
 
 
@@ -1551,6 +1879,65 @@ def fields(class_or_instance: Any) -> Tuple[Field, ...]:
     return tuple(f for f in fields.values() if f._field_type is _FIELD)
 
 
+def _set_class_cache(cls: type, name: str, value: Any) -> None:
+    # Store one of the _CLASS_CACHES on cls.  Go through type, in case
+    # the metaclass customizes attribute assignment.
+    type.__setattr__(cls, name, value)
+
+
+def _clear_class_caches(cls: type) -> None:
+    for name in _CLASS_CACHES:
+        if name in cls.__dict__:
+            type.__delattr__(cls, name)
+
+
+# Per-class (name, getter) pairs for the real fields of a dataclass,
+# built on first use by asdict()/astuple() so that recursing into a
+# dataclass doesn't re-filter __dataclass_fields__ for every instance.
+_FieldGetters = Tuple[Tuple[str, Callable[[Any], Any]], ...]
+
+
+def _field_getters(cls: type) -> _FieldGetters:
+    getters: Optional[_FieldGetters] = cls.__dict__.get(_FIELD_GETTERS)
+    if getters is None:
+        getters = tuple((f.name, operator.attrgetter(f.name)) for f in fields(cls))
+        _set_class_cache(cls, _FIELD_GETTERS, getters)
+    return getters
+
+
+# Per-class callables returning the values of the real fields of an
+# instance as a tuple, in field order, for when the names aren't needed.
+# Cached like the field getters.
+_ValuesGetter = Callable[[Any], Tuple[Any, ...]]
+
+
+def _no_values(obj: Any) -> Tuple[Any, ...]:
+    return ()
+
+
+def _values_getter(cls: type) -> _ValuesGetter:
+    cached: Optional[_ValuesGetter] = cls.__dict__.get(_FIELD_VALUES_GETTER)
+    if cached is not None:
+        return cached
+    names = [name for name, _ in _field_getters(cls)]
+    get_values: _ValuesGetter
+    if len(names) > 1:
+        # Fetches all the fields in one C call, and already returns
+        # them as a tuple.
+        get_values = operator.attrgetter(*names)
+    elif names:
+        # attrgetter() with one name returns the bare value.
+        get_value = operator.attrgetter(names[0])
+
+        def get_values(obj: Any) -> Tuple[Any, ...]:
+            return (get_value(obj),)
+
+    else:
+        get_values = _no_values
+    _set_class_cache(cls, _FIELD_VALUES_GETTER, get_values)
+    return get_values
+
+
 def _is_dataclass_instance(obj: Any) -> bool:
     """Returns True if obj is an instance of a dataclass."""
     return hasattr(type(obj), _FIELDS)
@@ -1563,6 +1950,165 @@ def is_dataclass(obj: Any) -> bool:
     return hasattr(cls, _FIELDS)
 
 
+# asdict() and astuple() convert a tree of objects bottom-up.  They
+# recurse (_asdict_inner() and _astuple_inner()), which is fastest, but
+# would run into the recursion limit on deeply nested values.  So the
+# recursion is given a depth budget (see _recursion_budget()), and a
+# branch nested deeper than that is handed to _convert(), which walks
+# it with an explicit stack instead.  Nothing is converted twice, and
+# a RecursionError raised by user code is never mistaken for deep
+# nesting.
+#
+# The conversion rules live in _expand(): it returns (value, None) for
+# a leaf, whose converted value is value, or (children, finish) for a
+# container, in which case each of children is converted in turn and
+# finish(obj, converted_children, factory) then builds the container's
+# converted value.  The recursive functions only inline the common
+# exact types, and follow _expand() for everything else.
+_Finisher = Callable[[Any, List[Any], Callable[..., Any]], Any]
+
+
+def _recursion_budget() -> int:
+    # How many levels of containers _asdict_inner()/_astuple_inner()
+    # recurse into before switching to _convert().  A level takes up to
+    # two frames (the function and a comprehension or generator), so
+    # this leaves at least half of the recursion limit to the caller
+    # and to copy.deepcopy() of the leaves.
+    return sys.getrecursionlimit() // 4
+
+
+def _convert(obj: Any, finish_dataclass: _Finisher, factory: Callable[..., Any]) -> Any:
+    children, finish = _expand(obj, finish_dataclass)
+    if finish is None:
+        return children
+    # Each stack entry is (finish, iterator over the children not yet
+    # converted, converted children so far, the container itself).
+    stack: List[Tuple[_Finisher, Any, List[Any], Any]] = [
+        (finish, iter(children), [], obj)
+    ]
+    # Ids of the containers on the stack.  A container that contains
+    # itself cannot be converted; raise RecursionError for it, as the
+    # recursive version does, rather than growing the stack until
+    # memory runs out.
+    active = {id(obj)}
+    while True:
+        finish, todo, done, parent = stack[-1]
+        for child in todo:
+            if type(child) in _ATOMIC_TYPES:
+                done.append(child)
+                continue
+            children, child_finish = _expand(child, finish_dataclass)
+            if child_finish is None:
+                done.append(children)
+                continue
+            if id(child) in active:
+                raise RecursionError(
+                    f"cannot convert {type(child).__name__} object that contains itself"
+                )
+            active.add(id(child))
+            stack.append((child_finish, iter(children), [], child))
+            break
+        else:
+            # Every child of parent has been converted.
+            stack.pop()
+            active.discard(id(parent))
+            value = finish(parent, done, factory)
+            if not stack:
+                return value
+            stack[-1][2].append(value)
+
+
+def _expand(obj: Any, finish_dataclass: _Finisher) -> Tuple[Any, Optional[_Finisher]]:
+    # finish_dataclass builds the converted value of a dataclass
+    # instance from its converted field values; it is all that differs
+    # between asdict() and astuple().
+    obj_type = type(obj)
+    if obj_type in _ATOMIC_TYPES:
+        return obj, None
+    # handle the builtin types first for speed; subclasses handled below.
+    # These exact-type tests also come before the dataclass test, since
+    # hasattr() is slow when the attribute is missing.
+    elif obj_type is list:
+        return obj, _finish_list
+    elif obj_type is dict:
+        return _dict_items(obj), _finish_dict
+    elif obj_type is tuple:
+        if _ATOMIC_TYPES.issuperset(map(type, obj)):
+            # Immutable all the way down; no need to rebuild it.
+            return obj, None
+        return obj, _finish_tuple
+    elif obj_type is frozenset and _ATOMIC_TYPES.issuperset(map(type, obj)):
+        # Likewise, and cheaper than the copy.deepcopy() it would get
+        # below.
+        return obj, None
+    elif hasattr(obj_type, _FIELDS):
+        return _field_values(obj), finish_dataclass
+    elif issubclass(obj_type, tuple):
+        if hasattr(obj, "_fields"):
+            # obj is a namedtuple.  Recurse into it, but the returned
+            # object is another namedtuple of the same type.  This is
+            # similar to how other list- or tuple-derived classes are
+            # treated (see below), but we just need to create them
+            # differently because a namedtuple's __new__ needs to be
+            # called differently (see bpo-34363).
+            return obj, _finish_namedtuple
+        else:
+            return obj, _finish_sequence_type
+    elif issubclass(obj_type, dict):
+        # Note: unlike CPython 3.12+, defaultdict is not special-cased
+        # here (see the feature matrix in the readme).
+        return _dict_items(obj), _finish_mapping_type
+    elif issubclass(obj_type, list):
+        return obj, _finish_sequence_type
+    else:
+        return copy.deepcopy(obj), None
+
+
+def _finish_list(obj: Any, values: List[Any], factory: Callable[..., Any]) -> Any:
+    return values
+
+
+def _finish_tuple(obj: Any, values: List[Any], factory: Callable[..., Any]) -> Any:
+    return tuple(values)
+
+
+def _finish_dict(obj: Any, values: List[Any], factory: Callable[..., Any]) -> Any:
+    # values holds the converted keys and values, interleaved.
+    items = iter(values)
+    return dict(zip(items, items))
+
+
+def _finish_namedtuple(obj: Any, values: List[Any], factory: Callable[..., Any]) -> Any:
+    # A namedtuple's __new__ takes the members as separate arguments
+    # (see bpo-34363).
+    return type(obj)(*values)
+
+
+def _finish_sequence_type(
+    obj: Any, values: List[Any], factory: Callable[..., Any]
+) -> Any:
+    # Assume we can create an object of this type by passing in an
+    # iterable of its members.
+    return type(obj)(values)
+
+
+def _finish_mapping_type(
+    obj: Any, values: List[Any], factory: Callable[..., Any]
+) -> Any:
+    items = iter(values)
+    return type(obj)(zip(items, items))
+
+
+def _dict_items(obj: Any) -> List[Any]:
+    # Keys and values of obj, interleaved, as expected by _finish_dict()
+    # and _finish_mapping_type().
+    return list(itertools.chain.from_iterable(obj.items()))
+
+
+def _field_values(obj: Any) -> Tuple[Any, ...]:
+    return _values_getter(type(obj))(obj)
+
+
 def asdict(obj: Any, *, dict_factory: Callable[..., Any] = dict) -> Any:
     """Return the fields of a dataclass instance as a new dictionary mapping
     field names to field values.
@@ -1584,60 +2130,71 @@ def asdict(obj: Any, *, dict_factory: Callable[..., Any] = dict) -> Any:
     """
     if not _is_dataclass_instance(obj):
         raise TypeError("asdict() should be called on dataclass instances")
-    return _asdict_inner(obj, dict_factory)
+    return _asdict_inner(obj, dict_factory, _recursion_budget())
 
 
-def _asdict_inner(obj: Any, dict_factory: Callable[..., Any]) -> Any:
+def _asdict_inner(obj: Any, dict_factory: Callable[..., Any], depth: int) -> Any:
     obj_type = type(obj)
     if obj_type in _ATOMIC_TYPES:
         return obj
+    if not depth:
+        # Nested too deeply to keep recursing; convert the rest of this
+        # branch without recursion.
+        return _convert(obj, _asdict_finish_dataclass, dict_factory)
+    depth -= 1
+    # Inline the common exact types, as in _expand(), testing members
+    # for atomic types here to save a call for each of them.
+    if obj_type is list:
+        return [
+            v if type(v) in _ATOMIC_TYPES else _asdict_inner(v, dict_factory, depth)
+            for v in obj
+        ]
+    elif obj_type is dict:
+        return {
+            (
+                k if type(k) in _ATOMIC_TYPES else _asdict_inner(k, dict_factory, depth)
+            ): (
+                v if type(v) in _ATOMIC_TYPES else _asdict_inner(v, dict_factory, depth)
+            )
+            for k, v in obj.items()
+        }
+    elif obj_type is tuple:
+        if _ATOMIC_TYPES.issuperset(map(type, obj)):
+            return obj
+        return tuple([_asdict_inner(v, dict_factory, depth) for v in obj])
     elif hasattr(obj_type, _FIELDS):
         # dataclass instance: fast path for the common case
         if dict_factory is dict:
             return {
-                f.name: _asdict_inner(getattr(obj, f.name), dict) for f in fields(obj)
+                name: _asdict_inner(get(obj), dict, depth)
+                for name, get in _field_getters(obj_type)
             }
         else:
             return dict_factory(
                 [
-                    (f.name, _asdict_inner(getattr(obj, f.name), dict_factory))
-                    for f in fields(obj)
+                    (name, _asdict_inner(get(obj), dict_factory, depth))
+                    for name, get in _field_getters(obj_type)
                 ]
             )
-    # handle the builtin types first for speed; subclasses handled below
-    elif obj_type is list:
-        return [_asdict_inner(v, dict_factory) for v in obj]
-    elif obj_type is dict:
-        return {
-            _asdict_inner(k, dict_factory): _asdict_inner(v, dict_factory)
-            for k, v in obj.items()
-        }
-    elif obj_type is tuple:
-        return tuple([_asdict_inner(v, dict_factory) for v in obj])
-    elif issubclass(obj_type, tuple):
-        if hasattr(obj, "_fields"):
-            # obj is a namedtuple.  Recurse into it, but the returned
-            # object is another namedtuple of the same type.  This is
-            # similar to how other list- or tuple-derived classes are
-            # treated (see below), but we just need to create them
-            # differently because a namedtuple's __new__ needs to be
-            # called differently (see bpo-34363).
-            return obj_type(*[_asdict_inner(v, dict_factory) for v in obj])
-        else:
-            return obj_type(_asdict_inner(v, dict_factory) for v in obj)
-    elif issubclass(obj_type, dict):
-        # Note: unlike CPython 3.12+, defaultdict is not special-cased
-        # here (see the feature matrix in the readme).
-        return obj_type(
-            (_asdict_inner(k, dict_factory), _asdict_inner(v, dict_factory))
-            for k, v in obj.items()
-        )
-    elif issubclass(obj_type, list):
-        # Assume we can create an object of this type by passing in a
-        # generator.
-        return obj_type(_asdict_inner(v, dict_factory) for v in obj)
+    children, finish = _expand(obj, _asdict_finish_dataclass)
+    if finish is None:
+        return children
+    return finish(
+        obj, [_asdict_inner(v, dict_factory, depth) for v in children], dict_factory
+    )
+
+
+def _asdict_finish_dataclass(
+    obj: Any, values: List[Any], dict_factory: Callable[..., Any]
+) -> Any:
+    getters = _field_getters(type(obj))
+    # dataclass instance: fast path for the common case
+    if dict_factory is dict:
+        return {name: value for (name, _), value in zip(getters, values)}
     else:
-        return copy.deepcopy(obj)
+        return dict_factory(
+            [(name, value) for (name, _), value in zip(getters, values)]
+        )
 
 
 def astuple(obj: Any, *, tuple_factory: Callable[..., Any] = tuple) -> Any:
@@ -1661,30 +2218,61 @@ def astuple(obj: Any, *, tuple_factory: Callable[..., Any] = tuple) -> Any:
 
     if not _is_dataclass_instance(obj):
         raise TypeError("astuple() should be called on dataclass instances")
-    return _astuple_inner(obj, tuple_factory)
+    return _astuple_inner(obj, tuple_factory, _recursion_budget())
 
 
-def _astuple_inner(obj: Any, tuple_factory: Callable[..., Any]) -> Any:
-    if type(obj) in _ATOMIC_TYPES:
+def _astuple_inner(obj: Any, tuple_factory: Callable[..., Any], depth: int) -> Any:
+    obj_type = type(obj)
+    if obj_type in _ATOMIC_TYPES:
         return obj
-    elif _is_dataclass_instance(obj):
-        return tuple_factory(
-            [_astuple_inner(getattr(obj, f.name), tuple_factory) for f in fields(obj)]
-        )
-    elif isinstance(obj, tuple) and hasattr(obj, "_fields"):
-        # obj is a namedtuple.  Recurse into it, but the returned
-        # object is another namedtuple of the same type (see
-        # bpo-34363 and _asdict_inner above).
-        return type(obj)(*[_astuple_inner(v, tuple_factory) for v in obj])
-    elif isinstance(obj, (list, tuple)):
-        return type(obj)(_astuple_inner(v, tuple_factory) for v in obj)
-    elif isinstance(obj, dict):
-        return type(obj)(
-            (_astuple_inner(k, tuple_factory), _astuple_inner(v, tuple_factory))
+    if not depth:
+        # As in _asdict_inner().
+        return _convert(obj, _astuple_finish_dataclass, tuple_factory)
+    depth -= 1
+    # As in _asdict_inner().
+    if obj_type is list:
+        return [
+            v if type(v) in _ATOMIC_TYPES else _astuple_inner(v, tuple_factory, depth)
+            for v in obj
+        ]
+    elif obj_type is dict:
+        return {
+            (
+                k
+                if type(k) in _ATOMIC_TYPES
+                else _astuple_inner(k, tuple_factory, depth)
+            ): (
+                v
+                if type(v) in _ATOMIC_TYPES
+                else _astuple_inner(v, tuple_factory, depth)
+            )
             for k, v in obj.items()
+        }
+    elif obj_type is tuple:
+        if _ATOMIC_TYPES.issuperset(map(type, obj)):
+            return obj
+        return tuple([_astuple_inner(v, tuple_factory, depth) for v in obj])
+    elif hasattr(obj_type, _FIELDS):
+        return tuple_factory(
+            [
+                v
+                if type(v) in _ATOMIC_TYPES
+                else _astuple_inner(v, tuple_factory, depth)
+                for v in _field_values(obj)
+            ]
         )
-    else:
-        return copy.deepcopy(obj)
+    children, finish = _expand(obj, _astuple_finish_dataclass)
+    if finish is None:
+        return children
+    return finish(
+        obj, [_astuple_inner(v, tuple_factory, depth) for v in children], tuple_factory
+    )
+
+
+def _astuple_finish_dataclass(
+    obj: Any, values: List[Any], tuple_factory: Callable[..., Any]
+) -> Any:
+    return tuple_factory(values)
 
 
 def make_dataclass(
@@ -1808,32 +2396,66 @@ def replace(obj: Any, **changes: Any) -> Any:
     if not _is_dataclass_instance(obj):
         raise TypeError("replace() should be called on dataclass instances")
 
+    return _replace_fn(obj.__class__)(obj, changes)
+
+
+# The replace() implementation for each class, see _replace_fn().
+_ReplaceFn = Callable[[Any, Dict[str, Any]], Any]
+
+
+def _replace_fn(cls: type) -> _ReplaceFn:
+    # Return a function (obj, changes) that does the work of replace()
+    # for instances of cls.  It is generated on first use, with the loop
+    # over the fields unrolled, so that each call doesn't have to walk
+    # and inspect the Field objects again.  It is cached on cls, like
+    # the field getters, and reads obj.__class__ at call time rather
+    # than closing over cls.
+    cached: Optional[_ReplaceFn] = cls.__dict__.get(_REPLACE)
+    if cached is not None:
+        return cached
+
     # It's an error to have init=False fields in 'changes'.
     # If a field is not in 'changes', read its value from the provided obj.
-
-    for f in getattr(obj, _FIELDS).values():
+    body_lines = []
+    for f in getattr(cls, _FIELDS).values():
         # Only consider normal fields or InitVars.
         if f._field_type is _FIELD_CLASSVAR:
             continue
 
+        name = repr(f.name)
         if not f.init:
             # Error if this field is specified in changes.
-            if f.name in changes:
-                raise ValueError(
-                    f"field {f.name} is declared with "
-                    "init=False, it cannot be specified with "
-                    "replace()"
-                )
-            continue
-
-        if f.name not in changes:
-            if f._field_type is _FIELD_INITVAR and f.default is MISSING:
-                raise ValueError(f"InitVar {f.name!r} must be specified with replace()")
-            changes[f.name] = getattr(obj, f.name)
+            msg = (
+                f"field {f.name} is declared with "
+                "init=False, it cannot be specified with "
+                "replace()"
+            )
+            body_lines += [f"  if {name} in changes:", f"   raise ValueError({msg!r})"]
+        elif f._field_type is _FIELD_INITVAR and f.default is MISSING:
+            msg = f"InitVar {f.name!r} must be specified with replace()"
+            body_lines += [
+                f"  if {name} not in changes:",
+                f"   raise ValueError({msg!r})",
+            ]
+        else:
+            body_lines += [
+                f"  if {name} not in changes:",
+                f"   changes[{name}] = obj.{f.name}",
+            ]
 
     # Create the new object, which calls __init__() and
     # __post_init__() (if defined), using all of the init fields we've
     # added and/or left in 'changes'.  If there are values supplied in
     # changes that aren't fields, this will correctly raise a
     # TypeError.
-    return obj.__class__(**changes)
+    body_lines.append("  return obj.__class__(**changes)")
+
+    body_str = "\n".join(body_lines)
+    txt = f"def __create_fn__():\n def replace(obj, changes):\n{body_str}\n return replace"
+    ns: Dict[str, Any] = {}
+    # As in _FuncBuilder.add_fns_to_class(), the source is assembled
+    # here, never user-supplied.
+    exec(_compile_create_fn(txt), {}, ns)  # noqa: S102
+    fn: _ReplaceFn = ns["__create_fn__"]()
+    _set_class_cache(cls, _REPLACE, fn)
+    return fn
@@ -1,6 +1,10 @@
 """Tests for dataclasses.py — pure Python, no test framework."""
 
+import copy
+import gc
+import inspect
 import io
+import itertools
 import os
 import pickle
 import sys
@@ -2009,6 +2013,31 @@ check("string KW_ONLY detected", skw.a == 1 and skw.b == 2)
 check_raises("string KW_ONLY rejects positional", TypeError, lambda: StrKwOnly(1, 2))
 
 
+# Only the parsing of a string annotation may be cached: what the name
+# refers to is looked up again for each class, since the module's
+# namespace can change in between.
+
+
+@dataclass
+class StrAliasBefore:
+    x: "LateClassVarAlias" = 0
+
+
+LateClassVarAlias = ClassVar
+
+
+@dataclass
+class StrAliasAfter:
+    x: "LateClassVarAlias" = 0
+
+
+check(
+    "string alias undefined is a field",
+    [f.name for f in fields(StrAliasBefore)] == ["x"],
+)
+check("string alias defined is a ClassVar", fields(StrAliasAfter) == ())
+
+
 # ============================================================
 section("Descriptor default and __set_name__ (PEP 487)")
 # ============================================================
@@ -2054,6 +2083,1013 @@ check("_return_type field default", ReturnTypeField()._return_type == 5)
 check("_return_type field in init", ReturnTypeField(_return_type=7)._return_type == 7)
 
 
+# ============================================================
+section("asdict()/astuple() field cache")
+# ============================================================
+
+# asdict()/astuple() cache each class's field getters; the cache must
+# give subclasses their own fields and must not keep classes alive.
+
+
+@dataclass
+class CacheBase:
+    x: int
+
+
+@dataclass
+class CacheChild(CacheBase):
+    y: int = 2
+
+
+check("cached asdict base", asdict(CacheBase(1)) == {"x": 1})
+check("cached asdict child", asdict(CacheChild(1)) == {"x": 1, "y": 2})
+check("cached astuple child", astuple(CacheChild(1, 3)) == (1, 3))
+
+Transient = make_dataclass("Transient", [("x", int)])
+check("transient asdict", asdict(Transient(1)) == {"x": 1})
+transient_ref = weakref.ref(Transient)
+del Transient
+gc.collect()
+check("field cache does not keep class alive", transient_ref() is None)
+
+
+class AllEqualMeta(type):
+    # Makes every class it creates equal to, and hash like, the others;
+    # the caches must still tell them apart.
+    def __eq__(cls, other):
+        return isinstance(other, AllEqualMeta)
+
+    def __hash__(cls):
+        return 1
+
+
+@dataclass
+class EqualMetaA(metaclass=AllEqualMeta):
+    x: int
+
+
+@dataclass
+class EqualMetaB(metaclass=AllEqualMeta):
+    y: int
+
+
+check("field cache keyed by class", asdict(EqualMetaA(1)) == {"x": 1})
+check("field cache ignores metaclass __eq__", asdict(EqualMetaB(2)) == {"y": 2})
+check("values cache keyed by class", astuple(EqualMetaA(1)) == (1,))
+check("values cache ignores metaclass __eq__", astuple(EqualMetaB(2)) == (2,))
+
+
+class CacheLate(CacheBase):
+    z: int = 3
+
+
+check("cache on undecorated subclass", asdict(CacheLate(1)) == {"x": 1})
+check("values cache on undecorated subclass", astuple(CacheLate(1)) == (1,))
+CacheLate = dataclass(CacheLate)
+check("cache dropped by decoration", asdict(CacheLate(1)) == {"x": 1, "z": 3})
+check("values cache dropped by decoration", astuple(CacheLate(1)) == (1, 3))
+
+
+# ============================================================
+section("Structurally identical classes share generated code")
+# ============================================================
+
+
+@dataclass
+class ShapeA:
+    x: int
+    y: list = field(default_factory=list)
+    z: int = 1
+
+
+@dataclass
+class ShapeB:
+    x: int
+    y: list = field(default_factory=dict)
+    z: int = 2
+
+
+check("shared __init__ code", ShapeA.__init__.__code__ is ShapeB.__init__.__code__)
+check("own __init__ function", ShapeA.__init__ is not ShapeB.__init__)
+check("own defaults", ShapeA(0).z == 1 and ShapeB(0).z == 2)
+check("own factories", ShapeA(0).y == [] and ShapeB(0).y == {})
+check("own qualname", ShapeB.__repr__.__qualname__ == "ShapeB.__repr__")
+check("own repr", repr(ShapeB(0)) == "ShapeB(x=0, y={}, z=2)")
+
+
+# ============================================================
+section("Frozen+slots __init__ stores through slot descriptors")
+# ============================================================
+
+
+@dataclass(frozen=True)
+class FrozenNoSlotsBase:
+    a: int
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenSlotsChild(FrozenNoSlotsBase):
+    b: int
+    c: int = field(default=3, init=False)
+
+
+fsc = FrozenSlotsChild(1, 2)
+check("frozen slots child values", (fsc.a, fsc.b, fsc.c) == (1, 2, 3))
+check("frozen slots child has no instance dict", fsc.__dict__ == {})
+check("frozen slots child pickles", pickle.loads(pickle.dumps(fsc)) == fsc)
+check(
+    "frozen slots child doc",
+    FrozenSlotsChild.__doc__
+    == "FrozenSlotsChild"
+    + str(inspect.signature(FrozenSlotsChild)).replace(" -> None", ""),
+)
+check_raises(
+    "frozen slots child still frozen", FrozenInstanceError, lambda: setattr(fsc, "b", 5)
+)
+
+
+@dataclass(frozen=True, slots=True)
+class FrozenSlotsOwnInit:
+    x: int
+
+    def __init__(self, value):
+        object.__setattr__(self, "x", value * 2)
+
+
+check("frozen slots keeps user __init__", FrozenSlotsOwnInit(2).x == 4)
+
+
+# _add_slots() creates the slotted class through the metaclass, so the
+# namespace it hands to the metaclass and to __init_subclass__() must
+# already hold the generated __init__.
+init_seen = []
+
+
+class InitSeenMeta(type):
+    def __new__(mcls, name, bases, namespace):
+        init_seen.append(("meta", "__init__" in namespace))
+        return super().__new__(mcls, name, bases, namespace)
+
+
+class InitSeenBase(metaclass=InitSeenMeta):
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        init_seen.append(("subclass", "__init__" in cls.__dict__))
+
+
+@dataclass(frozen=True, slots=True)
+class InitSeen(InitSeenBase):
+    x: int
+
+
+check(
+    "slotted class namespace has __init__",
+    init_seen[-2:] == [("meta", True), ("subclass", True)],
+)
+check("slotted class __init__ works", InitSeen(1).x == 1)
+
+
+# A subclass may override a field with a property; the inherited
+# __init__ must go through it, like object.__setattr__ does.
+property_set = []
+
+
+class PropertySubclass(FrozenSlotsChild):
+    @property
+    def b(self):
+        return -1
+
+    @b.setter
+    def b(self, value):
+        property_set.append(value)
+
+
+ps = PropertySubclass(1, 5)
+check("subclass property setter called by __init__", property_set == [5])
+check("subclass property getter used", ps.b == -1)
+
+
+# ============================================================
+section("Interned field names and shared __match_args__")
+# ============================================================
+
+
+@dataclass
+class MatchArgsTwin:
+    x: int
+    y: int
+    z: int = field(default=0, kw_only=True)
+
+
+@dataclass
+class MatchArgsTwin2:
+    x: int
+    y: int
+
+
+check("__match_args__ value", MatchArgsTwin.__match_args__ == ("x", "y"))
+check(
+    "__match_args__ tuple shared",
+    MatchArgsTwin.__match_args__ is MatchArgsTwin2.__match_args__,
+)
+
+# Built at run time, so not interned by the compiler.
+dynamic_name = "".join(map(str, "dynamic"))
+Interned = make_dataclass("Interned", [(dynamic_name, int)])
+check(
+    "make_dataclass field name interned",
+    fields(Interned)[0].name is sys.intern("dynamic"),
+)
+check("interned field usable", Interned(dynamic=1).dynamic == 1)
+
+
+# ============================================================
+section("asdict()/astuple() on deeply nested values")
+# ============================================================
+
+# Nesting deeper than the recursion limit allows makes asdict() and
+# astuple() fall back to a non-recursive walk, which must give the
+# same result.
+
+
+@dataclass
+class Link:
+    next: object
+    payload: object = None
+
+
+DeepPoint = namedtuple("DeepPoint", "x y")
+deep_depth = sys.getrecursionlimit() + 100
+deep_payload = (
+    [Nested(1), OrderedDict(a=Nested(2))],
+    {"k": DeepPoint(Nested(3), {1, 2})},
+)
+deep = None
+for _ in range(deep_depth):
+    deep = Link(deep)
+deep.payload = deep_payload
+
+deep_dict = asdict(deep)
+check(
+    "deep asdict payload",
+    deep_dict["payload"] == asdict(Link(None, deep_payload))["payload"],
+)
+deep_level = deep_dict
+for _ in range(deep_depth - 1):
+    deep_level = deep_level["next"]
+check("deep asdict depth", deep_level == {"next": None, "payload": None})
+check("deep asdict namedtuple kept", type(deep_dict["payload"][1]["k"]) is DeepPoint)
+check("deep asdict OrderedDict kept", type(deep_dict["payload"][0][1]) is OrderedDict)
+check(
+    "deep asdict dict_factory",
+    type(asdict(deep, dict_factory=OrderedDict)) is OrderedDict,
+)
+
+deep_tuple = astuple(deep)
+check("deep astuple payload", deep_tuple[1] == astuple(Link(None, deep_payload))[1])
+check("deep astuple tuple_factory", type(astuple(deep, tuple_factory=list)) is list)
+
+cyclic = Link(None)
+cyclic.next = [cyclic]
+check_raises("asdict on cyclic value", RecursionError, lambda: asdict(cyclic))
+check_raises("astuple on cyclic value", RecursionError, lambda: astuple(cyclic))
+
+
+class RaisesRecursion:
+    # A leaf whose copy fails with a RecursionError of its own, which
+    # must surface as is rather than start the conversion over.
+    copies = 0
+
+    def __deepcopy__(self, memo):
+        RaisesRecursion.copies += 1
+        raise RecursionError("from user code")
+
+
+check_raises(
+    "user RecursionError propagates",
+    RecursionError,
+    lambda: asdict(Link(None, [RaisesRecursion()])),
+)
+check("user RecursionError raised once", RaisesRecursion.copies == 1)
+
+
+class DeepList(list):
+    pass
+
+
+class DeepTuple(tuple):
+    pass
+
+
+@dataclass(frozen=True)
+class DeepFrozen:
+    x: int
+
+
+class DeepCopied:
+    def __init__(self, v):
+        self.v = v
+
+    def __eq__(self, other):
+        return type(other) is DeepCopied and self.v == other.v
+
+    __hash__ = None
+
+
+def same_conversion(a, b):
+    # Equal, and of the same types all the way down.
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(map(same_conversion, a, b))
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(map(same_conversion, a.values(), b.values()))
+    return a == b
+
+
+# Values that the recursive conversion and the non-recursive one (used
+# below the depth budget) must treat the same; extend this when adding
+# a case to either.
+shared_payloads = [
+    1,
+    "s",
+    None,
+    2.5,
+    (1, "a"),
+    frozenset({1, 2}),
+    ((1, 2), [3]),
+    [Nested(1), {"a": Nested(2)}],
+    {Nested(3).value: [Nested(4)]},
+    OrderedDict(a=Nested(5)),
+    DeepPoint(Nested(6), [7]),
+    DeepList([Nested(8)]),
+    DeepTuple((Nested(9), 1)),
+    {1, 2},
+    frozenset({DeepFrozen(1)}),
+    DeepCopied([1]),
+    Link(Nested(10), (Link(None),)),
+]
+for payload in shared_payloads:
+    deep_shared = Link(None, payload)
+    for _ in range(deep_depth):
+        deep_shared = Link(deep_shared)
+    for convert, unwrap, get_payload in (
+        (asdict, lambda d: d["next"], lambda d: d["payload"]),
+        (astuple, lambda t: t[0], lambda t: t[1]),
+        (
+            lambda o: asdict(o, dict_factory=OrderedDict),
+            lambda d: d["next"],
+            lambda d: d["payload"],
+        ),
+        (lambda o: astuple(o, tuple_factory=list), lambda t: t[0], lambda t: t[1]),
+    ):
+        deep_result = convert(deep_shared)
+        for _ in range(deep_depth):
+            deep_result = unwrap(deep_result)
+        shallow_result = convert(Link(None, payload))
+        check(
+            f"deep and shallow agree on {type(payload).__name__}",
+            same_conversion(deep_result, shallow_result)
+            and (get_payload(deep_result) is payload)
+            == (get_payload(shallow_result) is payload),
+        )
+
+
+# ============================================================
+section("replace() generated per class")
+# ============================================================
+
+
+@dataclass
+class ReplaceBase:
+    x: int
+    y: int = field(default=0, kw_only=True)
+    cv: ClassVar[int] = 5
+
+
+@dataclass
+class ReplaceChild(ReplaceBase):
+    scale: InitVar[int]
+    z: int = field(default=1, init=False)
+
+    def __post_init__(self, scale):
+        self.z = self.x * scale
+
+
+check("replace kw_only field", replace(ReplaceBase(1, y=2), x=3) == ReplaceBase(3, y=2))
+rc = replace(ReplaceChild(2, 3), scale=10)
+check("replace subclass", type(rc) is ReplaceChild and rc.z == 20)
+check("replace base after subclass", type(replace(ReplaceBase(1), y=4)) is ReplaceBase)
+try:
+    replace(ReplaceChild(2, 3), x=1)
+    replace_msg = None
+except ValueError as e:
+    replace_msg = str(e)
+check(
+    "replace InitVar message",
+    replace_msg == "InitVar 'scale' must be specified with replace()",
+)
+try:
+    replace(rc, z=1, scale=1)
+    replace_msg = None
+except ValueError as e:
+    replace_msg = str(e)
+check(
+    "replace init=False message",
+    replace_msg
+    == "field z is declared with init=False, it cannot be specified with replace()",
+)
+check_raises(
+    "replace ClassVar raises", TypeError, lambda: replace(ReplaceBase(1), cv=1)
+)
+
+TransientReplace = make_dataclass("TransientReplace", [("x", int)])
+check("transient replace", replace(TransientReplace(1), x=2).x == 2)
+transient_replace_ref = weakref.ref(TransientReplace)
+del TransientReplace
+gc.collect()
+check("replace cache does not keep class alive", transient_replace_ref() is None)
+check("replace keyed by class", replace(EqualMetaA(1), x=3) == EqualMetaA(3))
+check("replace ignores metaclass __eq__", replace(EqualMetaB(2), y=4) == EqualMetaB(4))
+
+
+class UnhashableMeta(type):
+    __hash__ = None
+
+
+@dataclass
+class UnhashableClass(metaclass=UnhashableMeta):
+    x: int
+
+
+check(
+    "replace with unhashable class",
+    replace(UnhashableClass(1), x=2) == UnhashableClass(2),
+)
+
+
+# ============================================================
+section("Frozen+slots __hash__ caching")
+# ============================================================
+
+
+@dataclass(frozen=True, slots=True)
+class HashCached:
+    x: int
+    y: str
+
+
+hc = HashCached(1, "a")
+check("cached hash matches tuple hash", hash(hc) == hash((1, "a")))
+check("cached hash stored in slot", hc.__dataclass_hash__ == hash((1, "a")))
+check("cached hash stable", hash(hc) == hash(hc))
+check("hash cache slot not a field", [f.name for f in fields(hc)] == ["x", "y"])
+hc_copy = pickle.loads(pickle.dumps(hc))
+check(
+    "pickle does not carry cached hash",
+    not hasattr(hc_copy, "__dataclass_hash__") and hash(hc_copy) == hash(hc),
+)
+check(
+    "deepcopy does not carry cached hash",
+    not hasattr(deepcopy(hc), "__dataclass_hash__"),
+)
+check("asdict ignores cached hash", asdict(hc) == {"x": 1, "y": "a"})
+
+
+@dataclass(frozen=True, slots=True)
+class HashCachedChild(HashCached):
+    z: int = 0
+
+
+check(
+    "hash cache slot inherited",
+    "__dataclass_hash__" not in HashCachedChild.__slots__
+    and hash(HashCachedChild(1, "a", 2)) == hash((1, "a", 2)),
+)
+
+
+@dataclass(frozen=True)
+class HashNotCached:
+    x: int
+
+
+hnc = HashNotCached(1)
+check("frozen without slots hash", hash(hnc) == hash((1,)))
+check("frozen without slots not cached", "__dataclass_hash__" not in vars(hnc))
+
+
+@dataclass(frozen=True, slots=True)
+class HashUserDefined:
+    x: int
+
+    def __hash__(self):
+        return 7
+
+
+check(
+    "user __hash__ gets no cache slot",
+    hash(HashUserDefined(1)) == 7 and HashUserDefined.__slots__ == ("x",),
+)
+
+
+# __post_init__ may hash the instance before setting a field, so a
+# cached hash would go stale.
+@dataclass(frozen=True, slots=True)
+class HashPostInit:
+    name: str
+    key: str = field(default="", compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "key", hash(self))
+        object.__setattr__(self, "name", self.name.lower())
+
+
+hpi = HashPostInit("A")
+check("post_init hash not stale", hash(hpi) == hash(HashPostInit("a")))
+check("post_init class gets no cache slot", HashPostInit.__slots__ == ("name", "key"))
+
+
+@dataclass(frozen=True, slots=True)
+class HashInitVar:
+    x: int
+    scale: InitVar[int] = 1
+
+    def __post_init__(self, scale):
+        object.__setattr__(self, "x", self.x * scale)
+
+
+check(
+    "InitVar class hash not cached",
+    hash(HashInitVar(2, 3)) == hash((6,)) and HashInitVar.__slots__ == ("x",),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class HashOwnInit:
+    x: int
+
+    def __init__(self, x):
+        object.__setattr__(self, "x", x)
+
+
+check(
+    "user __init__ class hash not cached",
+    hash(HashOwnInit(4)) == hash((4,)) and HashOwnInit.__slots__ == ("x",),
+)
+
+
+# ============================================================
+section("asdict()/astuple() share immutable leaves")
+# ============================================================
+
+
+@dataclass
+class Leaves:
+    t: tuple
+    fs: frozenset
+    nested: tuple
+    mixed: frozenset
+
+
+leaf_t = (1, "a", None, 2.5)
+leaf_fs = frozenset({1, "b"})
+leaf_nested = ((1, 2), [3])
+leaf_mixed = frozenset({HashNotCached(1)})
+leaves = Leaves(leaf_t, leaf_fs, leaf_nested, leaf_mixed)
+leaves_d = asdict(leaves)
+check("asdict shares atomic tuple", leaves_d["t"] is leaf_t)
+check("asdict shares atomic frozenset", leaves_d["fs"] is leaf_fs)
+check(
+    "asdict copies tuple with mutable member",
+    leaves_d["nested"] == leaf_nested
+    and leaves_d["nested"] is not leaf_nested
+    and leaves_d["nested"][1] is not leaf_nested[1],
+)
+check(
+    "asdict converts frozenset with dataclass member",
+    leaves_d["mixed"] == leaf_mixed and leaves_d["mixed"] is not leaf_mixed,
+)
+leaves_t = astuple(leaves)
+check("astuple shares atomic tuple", leaves_t[0] is leaf_t)
+check("astuple shares atomic frozenset", leaves_t[1] is leaf_fs)
+check("astuple copies tuple with mutable member", leaves_t[2][1] is not leaf_nested[1])
+deep_leaves = Link(None, leaves)
+for _ in range(deep_depth):
+    deep_leaves = Link(deep_leaves)
+deep_leaves_d = asdict(deep_leaves)
+deep_leaves_t = astuple(deep_leaves)
+for _ in range(deep_depth):
+    deep_leaves_d = deep_leaves_d["next"]
+    deep_leaves_t = deep_leaves_t[0]
+check("deep asdict shares atomic tuple", deep_leaves_d["payload"]["t"] is leaf_t)
+check("deep astuple shares atomic frozenset", deep_leaves_t[1][1] is leaf_fs)
+
+# ============================================================
+section("Frozen+slots pickling through __reduce_ex__")
+# ============================================================
+
+
+@dataclass(frozen=True, slots=True)
+class ReducePoint:
+    x: int
+    y: list = field(default_factory=list)
+
+
+rp = ReducePoint(1, [2])
+check("reduce_ex generated", "__reduce_ex__" in ReducePoint.__dict__)
+check("reduce_ex value", rp.__reduce_ex__(4) == (ReducePoint, (1, [2])))
+for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+    check(
+        f"reduce_ex pickle protocol {protocol}",
+        pickle.loads(pickle.dumps(rp, protocol)) == rp,
+    )
+rp_deep = deepcopy(rp)
+check("reduce_ex deepcopy", rp_deep == rp and rp_deep.y is not rp.y)
+check("reduce_ex copy", copy.copy(rp) == rp)
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceChild(ReducePoint):
+    z: int = 0
+
+
+check(
+    "reduce_ex subclass",
+    ReduceChild(1, [], 3).__reduce_ex__(2) == (ReduceChild, (1, [], 3)),
+)
+
+
+class ReducePlainChild(ReducePoint):
+    pass
+
+
+check(
+    "reduce_ex non-dataclass subclass falls back",
+    ReducePlainChild(1).__reduce_ex__(2)[0] is not ReducePlainChild
+    and pickle.loads(pickle.dumps(ReducePlainChild(1))) == ReducePlainChild(1),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceNoInit:
+    x: int
+    y: int = field(default=0, init=False)
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceInitVar:
+    x: int
+    k: InitVar[int] = 0
+
+
+@dataclass(frozen=True, slots=True)
+class ReducePostInit:
+    x: int
+
+    def __post_init__(self):
+        pass
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceKwOnly:
+    x: int = field(kw_only=True)
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceOwnState:
+    x: int
+
+    def __getstate__(self):
+        return [self.x]
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "x", state[0])
+
+
+class ReduceMixin:
+    __slots__ = ()
+
+    def __reduce__(self):
+        return (ReduceMixinUser, (-1,))
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceMixinUser(ReduceMixin):
+    x: int
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceOwnNew:
+    x: int
+
+    def __new__(cls, *args, **kwargs):
+        self = object.__new__(cls)
+        object.__setattr__(self, "x", 0)
+        return self
+
+
+reduce_calls = []
+
+
+class ReduceCallMeta(type):
+    def __call__(cls, *args, **kwargs):
+        reduce_calls.append(cls)
+        return super().__call__(*args, **kwargs)
+
+
+@dataclass(frozen=True, slots=True)
+class ReduceMetaCall(metaclass=ReduceCallMeta):
+    x: int
+
+
+for reduce_cls in (
+    ReduceNoInit,
+    ReduceInitVar,
+    ReducePostInit,
+    ReduceKwOnly,
+    ReduceOwnState,
+    ReduceMixinUser,
+    ReduceOwnNew,
+    ReduceMetaCall,
+):
+    check(
+        f"no reduce_ex for {reduce_cls.__name__}",
+        "__reduce_ex__" not in reduce_cls.__dict__,
+    )
+check(
+    "reduce_ex init=False fallback",
+    pickle.loads(pickle.dumps(ReduceNoInit(1))) == ReduceNoInit(1),
+)
+check(
+    "inherited __reduce__ honoured",
+    pickle.loads(pickle.dumps(ReduceMixinUser(5))).x == -1,
+)
+check(
+    "custom __new__ round-trips",
+    pickle.loads(pickle.dumps(ReduceOwnNew(3))) == ReduceOwnNew(3)
+    and copy.copy(ReduceOwnNew(3)).x == 3,
+)
+rmc = ReduceMetaCall(1)
+del reduce_calls[:]
+check(
+    "metaclass __call__ not invoked by pickle or copy",
+    pickle.loads(pickle.dumps(rmc)) == rmc
+    and copy.copy(rmc) == rmc
+    and reduce_calls == [],
+)
+check(
+    "no reduce_ex without frozen",
+    "__reduce_ex__"
+    not in dataclass(slots=True)(
+        type("RNF", (), {"__annotations__": {"x": int}})
+    ).__dict__,
+)
+
+
+# ============================================================
+section("Ordering methods compare field by field")
+# ============================================================
+
+
+class OrderProbe:
+    # Comparison results that aren't bools, to check they are passed
+    # through unchanged, as tuple comparison does.
+    def __init__(self, v):
+        self.v = v
+
+    def __eq__(self, other):
+        return "yes" if self.v == other.v else ""
+
+    def __lt__(self, other):
+        return ("lt", self.v, other.v)
+
+    def __le__(self, other):
+        return ("le", self.v, other.v)
+
+    __hash__ = None
+
+
+@dataclass(order=True)
+class Ordered3:
+    a: object
+    b: object
+    c: object = field(default=0, compare=False)
+
+
+@dataclass(order=True)
+class Ordered6:
+    a: object
+    b: object
+    c: object
+    d: object
+    e: object
+    f: object
+
+
+@dataclass(order=True)
+class Ordered0:
+    x: int = field(default=0, compare=False)
+
+
+order_nan = float("nan")
+order_values = [0, 1, order_nan, float("nan"), OrderProbe(0), OrderProbe(1)]
+order_mismatches = []
+for a, b, c, d in itertools.product(order_values, repeat=4):
+    left, right = Ordered3(a, b), Ordered3(c, d)
+    for op in ("__lt__", "__le__", "__gt__", "__ge__"):
+        try:
+            got = getattr(left, op)(right)
+        except (TypeError, AttributeError) as e:
+            got = type(e)
+        try:
+            want = getattr((a, b), op)((c, d))
+        except (TypeError, AttributeError) as e:
+            want = type(e)
+        if got != want:
+            order_mismatches.append((a, b, c, d, op, got, want))
+check("field-by-field ordering matches tuples", order_mismatches == [])
+check("identical nan compares equal", Ordered3(order_nan, 1) < Ordered3(order_nan, 2))
+check(
+    "ordering ignores compare=False",
+    Ordered3(1, 1, 5) <= Ordered3(1, 1, 0)
+    and not Ordered3(1, 1, 5) < Ordered3(1, 1, 0),
+)
+check(
+    "ordering without compare fields",
+    not Ordered0() < Ordered0(1)
+    and Ordered0() <= Ordered0(1)
+    and Ordered0() >= Ordered0(1),
+)
+check(
+    "ordering with many fields",
+    Ordered6(1, 2, 3, 4, 5, 6) < Ordered6(1, 2, 3, 4, 5, 7)
+    and Ordered6(1, 2, 3, 4, 5, 6) >= Ordered6(1, 2, 3, 4, 5, 6),
+)
+check(
+    "ordering other class",
+    Ordered3(1, 2).__lt__(Ordered6(1, 2, 3, 4, 5, 6)) is NotImplemented,
+)
+
+
+class CountingGets:
+    # Data descriptor that counts reads through instances.
+    def __init__(self):
+        self.gets = 0
+
+    def __set_name__(self, owner, name):
+        self.attr = "_" + name
+
+    def __get__(self, obj, owner):
+        if obj is None:
+            return 0
+        self.gets += 1
+        return getattr(obj, self.attr)
+
+    def __set__(self, obj, value):
+        setattr(obj, self.attr, value)
+
+
+@dataclass(order=True)
+class OrderedCounted:
+    x: int = CountingGets()
+    y: int = 0
+
+
+order_counter = OrderedCounted.__dict__["x"]
+order_left, order_right = OrderedCounted(1), OrderedCounted(2)
+order_counter.gets = 0
+order_result = order_left < order_right
+check("ordering reads a field once per side", order_result and order_counter.gets == 2)
+# Equal but not identical, so the == test runs too.
+order_left = OrderedCounted(int("1000"), 1)
+order_right = OrderedCounted(int("1000"), 2)
+order_counter.gets = 0
+order_result = order_left >= order_right
+check(
+    "ordering reads an equal field once per side",
+    not order_result and order_counter.gets == 2,
+)
+
+
+# ============================================================
+section("Generated __doc__ built on first access")
+# ============================================================
+
+
+@dataclass
+class LazyDoc:
+    x: int
+    y: str = "a"
+
+
+def generated_doc(cls):
+    # What the module builds; inspect's rendering differs on 3.6.
+    return cls.__name__ + str(inspect.signature(cls)).replace(" -> None", "")
+
+
+check("lazy doc not built yet", type(LazyDoc.__dict__["__doc__"]) is not str)
+check("lazy doc value", LazyDoc.__doc__ == generated_doc(LazyDoc))
+check("lazy doc names fields", "x" in LazyDoc.__doc__ and "'a'" in LazyDoc.__doc__)
+check("lazy doc cached on class", LazyDoc.__dict__["__doc__"] == LazyDoc.__doc__)
+
+
+@dataclass(frozen=True, slots=True)
+class LazyDocInstance:
+    x: int
+
+
+check(
+    "lazy doc from instance",
+    LazyDocInstance(1).__doc__ == generated_doc(LazyDocInstance),
+)
+check(
+    "lazy doc via inspect",
+    inspect.getdoc(LazyDocInstance) == generated_doc(LazyDocInstance),
+)
+
+
+@dataclass
+class LazyDocChild(LazyDoc):
+    z: int = 0
+
+
+class LazyDocPlain(LazyDocChild):
+    pass
+
+
+check(
+    "lazy doc subclass",
+    LazyDocChild.__doc__ == generated_doc(LazyDocChild)
+    and LazyDocChild.__doc__ != LazyDoc.__doc__,
+)
+check("lazy doc not inherited", LazyDocPlain.__doc__ is None)
+
+
+@dataclass
+class ExplicitDoc:
+    """Mine."""
+
+    x: int
+
+
+check("explicit doc kept", ExplicitDoc.__dict__["__doc__"] == "Mine.")
+
+
+class SealingMeta(type):
+    def __setattr__(cls, name, value):
+        if cls.__dict__.get("_sealed"):
+            raise AttributeError(f"{cls.__name__} is sealed")
+        super().__setattr__(name, value)
+
+
+@dataclass
+class LazyDocSealed(metaclass=SealingMeta):
+    x: int
+
+
+type.__setattr__(LazyDocSealed, "_sealed", True)
+check(
+    "lazy doc under a sealing metaclass",
+    LazyDocSealed.__doc__ == generated_doc(LazyDocSealed)
+    and LazyDocSealed.__dict__["__doc__"] == generated_doc(LazyDocSealed),
+)
+
+
+# ============================================================
+section("Field values fetched in one call")
+# ============================================================
+
+
+@dataclass(frozen=True, slots=True)
+class Values0:
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Values1:
+    x: int
+    k: InitVar[int] = 0
+
+
+@dataclass(frozen=True, slots=True)
+class Values3:
+    x: int
+    y: Values1
+    z: list = field(default_factory=list, init=False)
+
+
+values3 = Values3(1, Values1(2))
+check("astuple no fields", astuple(Values0()) == ())
+check("astuple one field", astuple(Values1(5)) == (5,))
+check("astuple many fields", astuple(values3) == (1, (2,), []))
+check("getstate no fields", Values0().__getstate__() == [])
+check("getstate one field", Values1(5).__getstate__() == [5])
+check("getstate many fields", values3.__getstate__() == [1, Values1(2), []])
+check("pickle via getstate", pickle.loads(pickle.dumps(values3)) == values3)
+
+
 # ============================================================
 # Summary
 # ============================================================